@@ -1,11 +1,12 @@
+import errno
 import os
 from pathlib import Path
+import shutil
+import stat
 import subprocess
-from typing import Any, Iterable, Optional, List
+from typing import Any, Iterable, Iterator, Optional, List, Tuple
 from urllib.parse import urlparse
 
-import sysrsync
-
 from snakemake_interface_common.exceptions import WorkflowError
 from snakemake_interface_storage_plugins.storage_provider import (  # noqa: F401
     StorageProviderBase,
@@ -26,6 +27,136 @@ from snakemake_interface_storage_plugins.io import (
     get_constant_prefix,
 )
 
+_RSYNC_PREFIX = "rsync://"
+_RSYNC_PREFIX_LEN = len(_RSYNC_PREFIX)
+# stat errors that mean the object does not exist (as in pathlib's Path.exists)
+_MISSING_ERRNOS = (errno.ENOENT, errno.ENOTDIR, errno.EBADF, errno.ELOOP)
+
+
+def _fast_parse_rsync(query: str) -> Optional[Tuple[str, str]]:
+    """Split a plain rsync URL into (netloc, path) without urlparse.
+
+    Return None if the query does not have the canonical shape, in which case the
+    caller should fall back to urlparse.
+    """
+    if not query.startswith(_RSYNC_PREFIX) or "?" in query or "#" in query:
+        return None
+    rest = query[_RSYNC_PREFIX_LEN:]
+    slash = rest.find("/")
+    if slash == -1:
+        netloc, path = rest, ""
+    else:
+        netloc, path = rest[:slash], rest[slash:]
+    if "[" in netloc or "]" in netloc:
+        # IPv6 hosts need the validation done by urlparse
+        return None
+    return netloc, path
+
+
+def _split_query(query: str) -> Tuple[str, str, str]:
+    """Return (scheme, netloc, path) of a query."""
+    fast = _fast_parse_rsync(query)
+    if fast is not None:
+        return ("rsync",) + fast
+    parsed = urlparse(query)
+    return parsed.scheme, parsed.netloc, parsed.path
+
+
+# copy_file_range errors on which we fall back to a regular copy
+_COPY_FILE_RANGE_FALLBACK = (
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.EINVAL,
+    errno.ETXTBSY,
+)
+
+
+def _copy_file(src: str, dst: str):
+    """Copy a file including metadata, like shutil.copy2 but faster on Linux.
+
+    The data is copied in-kernel with os.copy_file_range where available (which
+    also allows reflinks on supporting filesystems). Symlinks are copied as links.
+    """
+    if hasattr(os, "copy_file_range") and not os.path.islink(src):
+        try:
+            copied = _copy_file_range(src, dst)
+        except OSError as e:
+            if e.errno not in _COPY_FILE_RANGE_FALLBACK:
+                raise
+        else:
+            if copied:
+                shutil.copystat(src, dst)
+                return
+    shutil.copy2(src, dst, follow_symlinks=False)
+
+
+def _copy_file_range(src: str, dst: str) -> bool:
+    """Copy src to dst with os.copy_file_range, returning whether it succeeded.
+
+    Some filesystems (e.g. procfs, or cross-filesystem copies on Linux 5.3 to 5.18)
+    report a size but return 0 without copying anything. In that case, and for
+    files reporting size 0, False is returned and the caller has to fall back to a
+    regular copy.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(infd).st_size
+        copied = 0
+        while copied < size:
+            n = os.copy_file_range(infd, outfd, size - copied)
+            if n == 0:
+                break
+            copied += n
+    return size > 0 and copied == size
+
+
+def _dir_timestamp_mtime(path: str) -> Optional[float]:
+    """Return the mtime of the snakemake timestamp file in the given directory.
+
+    Return None if there is no timestamp file.
+    """
+    try:
+        return os.stat(
+            os.path.join(path, ".snakemake_timestamp"), follow_symlinks=False
+        ).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _iter_scandir(root: str) -> Iterator[str]:
+    """Recursively yield all paths below root.
+
+    Unlike Path.rglob, this reuses the file type information returned with the
+    directory entries, so that no additional stat is needed to decide whether to
+    descend.
+    """
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except PermissionError:
+            # skip unreadable directories, like Path.rglob does
+            continue
+        with entries:
+            for entry in entries:
+                yield entry.path
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
+
+def _validate_rsync_query(query: str) -> Tuple[bool, Optional[str]]:
+    """Validate a query, returning (valid, reason)."""
+    if not query.startswith(_RSYNC_PREFIX):
+        return False, "scheme must be rsync"
+    try:
+        # only queries that miss the fast path reach urlparse, which raises
+        # ValueError e.g. for malformed IPv6 hosts
+        _split_query(query)
+    except ValueError as e:
+        return False, f"cannot be parsed as URL ({e})"
+    return True, None
+
 
 # Required:
 # Implementation of your storage provider
@@ -79,19 +210,12 @@ class StorageProvider(StorageProviderBase):
         # Ensure that also queries containing wildcards (e.g. {sample}) are accepted
         # and considered valid. The wildcards will be resolved before the storage
         # object is actually used.
-        try:
-            parsed = urlparse(query)
-        except Exception as e:
-            return StorageQueryValidationResult(
-                query=query,
-                valid=False,
-                reason=f"cannot be parsed as URL ({e})",
-            )
-        if not (parsed.scheme == "rsync"):
+        valid, reason = _validate_rsync_query(query)
+        if not valid:
             return StorageQueryValidationResult(
                 query=query,
                 valid=False,
-                reason="scheme must be rsync",
+                reason=reason,
             )
         return StorageQueryValidationResult(
             query=query,
@@ -117,10 +241,40 @@ class StorageObject(
         # This is optional and can be removed if not needed.
         # Alternatively, you can e.g. prepare a connection to your storage backend here.
         # and set additional attributes.
-        parsed = urlparse(self.query)
-        query = f"{parsed.netloc}{parsed.path}"
-        self.query_path = Path(query)
-        self.scheme = parsed.scheme
+        self.scheme, self.netloc, self.path = _split_query(self.query)
+        # Keep the path as a plain str: it is passed to os functions in hot paths
+        # and a Path would be allocated and re-stat'ed over and over. Trailing
+        # slashes are stripped like pathlib does.
+        query_path = f"{self.netloc}{self.path}"
+        self.query_path = query_path.rstrip("/") or query_path
+        # pre-encoded variant for os calls in hot paths, sparing the implicit
+        # str -> bytes conversion on every call
+        self.query_path_b = os.fsencode(self.query_path)
+        suffix = self.path
+        if suffix.startswith("/"):
+            # convert absolute path to unique relative path
+            suffix = f"__abspath__/{suffix[1:]}"
+        self._local_suffix = suffix
+        self._cache_key: Optional[str] = None
+        self._local_path: Optional[Path] = None
+
+    def local_path(self) -> Path:
+        """Return the local path that would represent the query, computed only once
+        per object."""
+        if self._overwrite_local_path:
+            return self._overwrite_local_path
+        if self._local_path is None:
+            self._local_path = super().local_path()
+        return self._local_path
+
+    def cache_key(self, local_suffix: Optional[str] = None) -> str:
+        """Return a key for the cache, computed only once per object."""
+        if local_suffix is not None or self._overwrite_local_path is not None:
+            # let the base class handle (and reject) overwritten local paths
+            return super().cache_key(local_suffix)
+        if self._cache_key is None:
+            self._cache_key = super().cache_key()
+        return self._cache_key
 
     async def inventory(self, cache: IOCacheStorageInterface):
         """From this file, try to find as much existence and modification date
@@ -132,17 +286,22 @@ class StorageObject(
         if key in cache.exists_in_storage:
             return
 
-        if not self.exists():
+        # EAFP: a failing stat is the existence check, no separate (retried)
+        # exists() call needed. Start with lstat, so that only symlinks need a
+        # second stat for their target.
+        try:
+            lstat = os.lstat(self.query_path_b)
+            if stat.S_ISLNK(lstat.st_mode):
+                st = os.stat(self.query_path_b)
+            else:
+                st = lstat
+        except OSError as e:
+            if e.errno not in _MISSING_ERRNOS:
+                raise
             cache.exists_in_storage[key] = False
             return
-        stat = self._stat()
-        if self.query_path.is_symlink():
-            # get symlink stat
-            lstat = self._stat(follow_symlinks=False)
-        else:
-            lstat = stat
         cache.mtime[key] = Mtime(storage=self._stat_to_mtime(lstat))
-        cache.size[key] = stat.st_size
+        cache.size[key] = st.st_size
         cache.exists_in_storage[key] = True
 
     def get_inventory_parent(self) -> Optional[str]:
@@ -152,12 +311,9 @@ class StorageObject(
 
     def local_suffix(self) -> str:
         """Return a unique suffix for the local path, determined from self.query."""
-        parsed = urlparse(self.query)
-        suffix = parsed.path
-        if suffix.startswith("/"):
-            # convert absolute path to unique relative path
-            suffix = f"__abspath__/{suffix[1:]}"
-        return suffix
+        # computed once in __post_init__, as this is called repeatedly during DAG
+        # construction
+        return self._local_suffix
 
     def cleanup(self):
         """Perform local cleanup of any remainders of the storage object."""
@@ -171,7 +327,13 @@ class StorageObject(
     @retry_decorator
     def exists(self) -> bool:
         # return True if the object exists
-        return self.query_path.exists()
+        try:
+            self._stat()
+        except OSError as e:
+            if e.errno not in _MISSING_ERRNOS:
+                raise
+            return False
+        return True
 
     @retry_decorator
     def mtime(self) -> float:
@@ -187,10 +349,19 @@ class StorageObject(
     def retrieve_object(self):
         """Rsync object to local storage path if it does not exist."""
         # Ensure that the object is accessible locally under self.local_path()
-        cmd = sysrsync.get_rsync_command(
-            str(self.query_path), str(self.local_path()), options=["-av"]
-        )
-        self._run_cmd(cmd)
+        local_path = str(self.local_path())
+        is_file = os.path.isfile(self.query_path_b)
+        if is_file and not os.path.lexists(local_path):
+            # Nothing to compare against on first retrieval, so the rsync delta
+            # algorithm would be pure overhead. Copy the file directly instead.
+            _copy_file(self.query_path, local_path)
+            return
+        # Sync the contents of directories into the local path rather than
+        # creating a subdirectory in it.
+        source = self.query_path if is_file else f"{self.query_path.rstrip('/')}/"
+        # Source and destination are both local, hence transfer whole files
+        # instead of computing deltas.
+        self._run_cmd(["rsync", "-a", "--whole-file", "--", source, local_path])
 
     # The following to methods are only required if the class inherits from
     # StorageObjectReadWrite.
@@ -215,7 +386,8 @@ class StorageObject(
                 stderr=subprocess.STDOUT,
             )
         except subprocess.CalledProcessError as e:
-            raise WorkflowError(e.stdout.decode())
+            # output is only decoded on failure; never fail on undecodable bytes here
+            raise WorkflowError(e.stdout.decode(errors="replace"))
 
     # The following to methods are only required if the class inherits from
     # StorageObjectGlob.
@@ -227,25 +399,32 @@ class StorageObject(
         # The method has to return concretized queries without any remaining wildcards.
         # Use snakemake_executor_plugins.io.get_constant_prefix(self.query) to get the
         # prefix of the query before the first wildcard.
-        prefix = Path(get_constant_prefix(self.query))
-        if prefix.is_dir():
-            return map(str, prefix.rglob("*"))
+        prefix = get_constant_prefix(self.query_path, strip_incomplete_parts=True)
+        if os.path.isdir(prefix):
+            return (f"{_RSYNC_PREFIX}{path}" for path in _iter_scandir(prefix))
+        elif get_constant_prefix(self.query_path) == self.query_path:
+            # no wildcards, the query itself is the only candidate
+            return (self.query,)
         else:
-            return (prefix,)
+            return ()
 
     def _stat(self, follow_symlinks: bool = True):
         # We don't want the cached variant (Path.stat), as we cache ourselves in
         # inventory and afterwards the information may change.
-        return os.stat(self.query_path, follow_symlinks=follow_symlinks)
+        return os.stat(self.query_path_b, follow_symlinks=follow_symlinks)
 
-    @property
-    def _timestamp_path(self):
-        return self.query_path / ".snakemake_timestamp"
-
-    def _stat_to_mtime(self, stat):
-        if self.query_path.is_dir():
+    def _stat_to_mtime(self, st):
+        # Reuse the given stat result to tell whether this is a directory. Only
+        # for symlinks another stat is needed to check the target.
+        if stat.S_ISLNK(st.st_mode):
+            is_dir = os.path.isdir(self.query_path_b)
+        else:
+            is_dir = stat.S_ISDIR(st.st_mode)
+        if is_dir:
             # use the timestamp file if possible
-            timestamp = self._timestamp_path
-            if timestamp.exists():
-                return os.stat(timestamp, follow_symlinks=False).st_mtime
-        return stat.st_mtime
+            mtime = _dir_timestamp_mtime(self.query_path)
+            if mtime is not None:
+                return mtime
+        # Deliberately seconds as float: Snakemake compares this against local
+        # st_mtime values, and os.stat has already created the float object.
+        return st.st_mtime
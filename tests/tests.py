@@ -1,10 +1,16 @@
+import asyncio
+import errno
 import os
+import shutil
 from typing import Optional, Type
 import uuid
+import pytest
+from snakemake.io import IOCache
+from snakemake_interface_common.exceptions import WorkflowError
 from snakemake_interface_storage_plugins.tests import TestStorageBase
 from snakemake_interface_storage_plugins.storage_provider import StorageProviderBase
 from snakemake_interface_storage_plugins.settings import StorageProviderSettingsBase
-from snakemake_storage_plugin_rsync import StorageProvider
+from snakemake_storage_plugin_rsync import StorageProvider, _copy_file
 
 
 class TestStorage(TestStorageBase):
@@ -28,3 +34,240 @@ class TestStorage(TestStorageBase):
 
     def get_storage_provider_settings(self) -> Optional[StorageProviderSettingsBase]:
         return None
+
+
+def test_query_validation_invalid():
+    res = StorageProvider.is_valid_query("http://test/test.txt")
+    assert not res
+    assert res.reason == "scheme must be rsync"
+    for query in ["rsync://[x?y", "rsync://[x/y"]:
+        res = StorageProvider.is_valid_query(query)
+        assert not res
+        assert res.reason.startswith("cannot be parsed as URL")
+
+
+def _get_provider(tmp_path) -> StorageProvider:
+    return StorageProvider(
+        local_prefix=tmp_path / "local_prefix",
+        settings=None,
+    )
+
+
+def _inventory(obj):
+    cache = IOCache(max_wait_time=10)
+    asyncio.run(obj.inventory(cache))
+    return cache
+
+
+def test_inventory_file_created_after_sibling(tmp_path):
+    provider = _get_provider(tmp_path)
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "early.txt").write_text("early")
+    early = provider.object(f"rsync://{src}/early.txt")
+    assert _inventory(early).exists_in_storage[early.cache_key()]
+
+    late = provider.object(f"rsync://{src}/late.txt")
+    assert not _inventory(late).exists_in_storage[late.cache_key()]
+    (src / "late.txt").write_text("late")
+    late = provider.object(f"rsync://{src}/late.txt")
+    cache = _inventory(late)
+    assert cache.exists_in_storage[late.cache_key()]
+    assert cache.size[late.cache_key()] == 4
+
+
+def test_inventory_symlinks(tmp_path):
+    provider = _get_provider(tmp_path)
+    (tmp_path / "target.txt").write_text("target")
+    (tmp_path / "link.txt").symlink_to(tmp_path / "target.txt")
+    (tmp_path / "dangling.txt").symlink_to(tmp_path / "missing.txt")
+
+    link = provider.object(f"rsync://{tmp_path}/link.txt")
+    cache = _inventory(link)
+    assert cache.exists_in_storage[link.cache_key()]
+    assert cache.size[link.cache_key()] == 6
+    assert cache.mtime[link.cache_key()].storage() == os.lstat(link.query_path).st_mtime
+
+    dangling = provider.object(f"rsync://{tmp_path}/dangling.txt")
+    assert not _inventory(dangling).exists_in_storage[dangling.cache_key()]
+
+
+def test_exists_missing(tmp_path, monkeypatch):
+    provider = _get_provider(tmp_path)
+    (tmp_path / "file.txt").write_text("test")
+    (tmp_path / "loop").symlink_to(tmp_path / "loop")
+    for query in [
+        f"rsync://{tmp_path}/missing.txt",
+        f"rsync://{tmp_path}/file.txt/child.txt",
+        f"rsync://{tmp_path}/loop",
+    ]:
+        assert not provider.object(query).exists()
+
+    # errors other than non-existence are not reported as missing
+    obj = provider.object(f"rsync://{tmp_path}/file.txt")
+
+    def stat_denied(path, *args, **kwargs):
+        raise PermissionError(errno.EACCES, "Permission denied", path)
+
+    monkeypatch.setattr(os, "stat", stat_denied)
+    with pytest.raises(PermissionError):
+        # bypass the retry decorator
+        type(obj).exists.__wrapped__(obj)
+
+
+def test_copy_file(tmp_path):
+    data = os.urandom(3 * 2**20 + 17)
+    (tmp_path / "src").write_bytes(data)
+    _copy_file(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert (tmp_path / "dst").read_bytes() == data
+    assert os.stat(tmp_path / "dst").st_mtime == os.stat(tmp_path / "src").st_mtime
+
+    (tmp_path / "link").symlink_to(tmp_path / "src")
+    _copy_file(str(tmp_path / "link"), str(tmp_path / "link_copy"))
+    assert os.readlink(tmp_path / "link_copy") == str(tmp_path / "src")
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "copy_file_range"), reason="os.copy_file_range not available"
+)
+def test_copy_file_short_copy_falls_back(tmp_path, monkeypatch):
+    # emulate filesystems on which copy_file_range copies nothing
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0)
+    (tmp_path / "src").write_text("test")
+    _copy_file(str(tmp_path / "src"), str(tmp_path / "dst"))
+    assert (tmp_path / "dst").read_text() == "test"
+
+
+def test_list_candidate_matches(tmp_path):
+    provider = _get_provider(tmp_path)
+    (tmp_path / "src" / "sub").mkdir(parents=True)
+    (tmp_path / "src" / "a.txt").write_text("a")
+    (tmp_path / "src" / "sub" / "b.txt").write_text("b")
+
+    obj = provider.object(f"rsync://{tmp_path}/src/{{sample}}.txt")
+    assert sorted(obj.list_candidate_matches()) == [
+        f"rsync://{tmp_path}/src/a.txt",
+        f"rsync://{tmp_path}/src/sub",
+        f"rsync://{tmp_path}/src/sub/b.txt",
+    ]
+
+    obj = provider.object(f"rsync://{tmp_path}/src/a.txt")
+    assert list(obj.list_candidate_matches()) == [obj.query]
+
+    obj = provider.object(f"rsync://{tmp_path}/nope/{{sample}}.txt")
+    assert list(obj.list_candidate_matches()) == []
+
+
+def test_list_candidate_matches_skips_unreadable(tmp_path, monkeypatch):
+    provider = _get_provider(tmp_path)
+    (tmp_path / "src" / "sub").mkdir(parents=True)
+    (tmp_path / "src" / "a.txt").write_text("a")
+    (tmp_path / "src" / "sub" / "b.txt").write_text("b")
+    unreadable = str(tmp_path / "src" / "sub")
+    scandir = os.scandir
+
+    def mock_scandir(path):
+        if path == unreadable:
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", mock_scandir)
+    obj = provider.object(f"rsync://{tmp_path}/src/{{sample}}.txt")
+    assert sorted(obj.list_candidate_matches()) == [
+        f"rsync://{tmp_path}/src/a.txt",
+        f"rsync://{tmp_path}/src/sub",
+    ]
+
+
+def test_cache_key_rejects_overwritten_local_path(tmp_path):
+    provider = _get_provider(tmp_path)
+    obj = provider.object(f"rsync://{tmp_path}/test.txt")
+    assert obj.cache_key() == str(obj.local_path())
+    obj.set_local_path(tmp_path / "elsewhere.txt")
+    with pytest.raises(AssertionError):
+        obj.cache_key()
+
+
+def test_mtime_directory_timestamp(tmp_path):
+    provider = _get_provider(tmp_path)
+    (tmp_path / "dir").mkdir()
+    query = f"rsync://{tmp_path}/dir"
+    assert provider.object(query).mtime() == os.stat(tmp_path / "dir").st_mtime
+
+    timestamp = tmp_path / "dir" / ".snakemake_timestamp"
+    timestamp.touch()
+    os.utime(timestamp, (1, 1))
+    assert provider.object(query).mtime() == 1
+
+
+def test_inventory_missing(tmp_path, monkeypatch):
+    provider = _get_provider(tmp_path)
+    (tmp_path / "file.txt").write_text("test")
+    (tmp_path / "loop").symlink_to(tmp_path / "loop")
+    for query in [
+        f"rsync://{tmp_path}/missing.txt",
+        f"rsync://{tmp_path}/file.txt/child.txt",
+        f"rsync://{tmp_path}/loop",
+    ]:
+        obj = provider.object(query)
+        assert not _inventory(obj).exists_in_storage[obj.cache_key()]
+
+    # errors other than non-existence are not reported as missing
+    obj = provider.object(f"rsync://{tmp_path}/file.txt")
+
+    def lstat_denied(path, *args, **kwargs):
+        raise PermissionError(errno.EACCES, "Permission denied", path)
+
+    monkeypatch.setattr(os, "lstat", lstat_denied)
+    with pytest.raises(PermissionError):
+        _inventory(obj)
+
+
+def test_run_cmd_failure(tmp_path):
+    obj = _get_provider(tmp_path).object(f"rsync://{tmp_path}/test.txt")
+    with pytest.raises(WorkflowError, match="failed\ufffd"):
+        obj._run_cmd(["sh", "-c", "printf 'failed\\377'; exit 1"])
+
+
+requires_rsync = pytest.mark.skipif(
+    shutil.which("rsync") is None, reason="rsync not installed"
+)
+
+
+def _retrieve(obj):
+    obj.local_path().parent.mkdir(parents=True, exist_ok=True)
+    # bypass the retry decorator
+    type(obj).retrieve_object.__wrapped__(obj)
+
+
+@requires_rsync
+@pytest.mark.parametrize("trailing_slash", ["", "/"])
+def test_retrieve_directory(tmp_path, trailing_slash):
+    (tmp_path / "src" / "dir" / "sub").mkdir(parents=True)
+    (tmp_path / "src" / "dir" / "a.txt").write_text("a")
+    (tmp_path / "src" / "dir" / "sub" / "b.txt").write_text("b")
+    obj = _get_provider(tmp_path).object(f"rsync://{tmp_path}/src/dir{trailing_slash}")
+    _retrieve(obj)
+    local_path = obj.local_path()
+    assert (local_path / "a.txt").read_text() == "a"
+    assert (local_path / "sub" / "b.txt").read_text() == "b"
+    assert not (local_path / "dir").exists()
+
+
+@requires_rsync
+def test_retrieve_existing_local_copy(tmp_path):
+    src = tmp_path / "src.txt"
+    src.write_text("old")
+    obj = _get_provider(tmp_path).object(f"rsync://{src}")
+    _retrieve(obj)
+    assert obj.local_path().read_text() == "old"
+    src.write_text("updated")
+    _retrieve(obj)
+    assert obj.local_path().read_text() == "updated"
+
+
+@requires_rsync
+def test_retrieve_failure(tmp_path):
+    obj = _get_provider(tmp_path).object(f"rsync://{tmp_path}/missing")
+    with pytest.raises(WorkflowError):
+        _retrieve(obj)